@@ -0,0 +1,217 @@
+"""
+Static export: pre-render every feed to disk so a proxy can serve them directly.
+
+Layout under the output directory:
+    ics/unc.ics
+    ics/bills/default.ics          (what a bare /ics/bills returns)
+    ics/bills/<zip>/<subs>.ics     (subs exactly as it appears in the query)
+    manifest.json                  (path -> ETag and size)
+
+Each file is rendered with the same arguments the API would receive for the
+matching URL, so the proxy and the API always return the same feed.
+
+Each .ics gets a gzip sibling (.ics.gz) for Caddy's `file_server { precompressed gzip }`.
+Files are written to a temp file and renamed into place, so readers never see
+a partial feed. A feed whose content hasn't changed (ignoring DTSTAMP) is left
+untouched, keeping its mtime, and therefore the proxy's ETag, stable. Feeds
+no longer in the configured set are removed.
+
+Usage:
+    python -m app.export --out /srv/teamwatcher --zip 11218 --zip 14201 \\
+        --subs paramount,youtubetv --subs paramount
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from .feeds import render_bills, render_unc, DEFAULT_ZIP, DEFAULT_SUBS
+
+EXPORT_DIR = os.environ.get("TEAMWATCHER_EXPORT_DIR", "")
+EXPORT_INTERVAL = int(os.environ.get("TEAMWATCHER_EXPORT_INTERVAL", "3600"))
+# Whitespace-separated lists; each subs entry is itself comma-separated
+EXPORT_ZIPS = os.environ.get("TEAMWATCHER_EXPORT_ZIPS", DEFAULT_ZIP).split()
+EXPORT_SUBS = os.environ.get("TEAMWATCHER_EXPORT_SUBS", DEFAULT_SUBS).split()
+
+ZIP_RE = re.compile(r"^\d{5}$")
+# Used verbatim as a file name, so keep it to a plain comma-separated list
+SUBS_RE = re.compile(r"^[A-Za-z0-9_+-]+(,[A-Za-z0-9_+-]+)*$")
+
+
+def _validate(zips: List[str], subs_options: List[str]) -> None:
+    for zip_code in zips:
+        if not ZIP_RE.match(zip_code):
+            raise ValueError(f"Invalid ZIP code for export: {zip_code!r}")
+    for subs in subs_options:
+        if not SUBS_RE.match(subs):
+            raise ValueError(f"Invalid subs list for export: {subs!r}")
+
+
+def feed_etag(ics: str) -> str:
+    """Content hash of a feed, ignoring DTSTAMP (which changes on every render)."""
+    digest = hashlib.sha256()
+    for line in ics.split("\r\n"):
+        if not line.startswith("DTSTAMP:"):
+            digest.update(line.encode("utf-8"))
+            digest.update(b"\n")
+    return '"' + digest.hexdigest()[:32] + '"'
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates 0600; the proxy may run as another user
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _read_text(path: str) -> Optional[str]:
+    try:
+        with open(path, encoding="utf-8", newline="") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def write_feed(out_dir: str, rel_path: str, ics: str) -> Dict[str, object]:
+    """
+    Write one feed and its gzip sibling, skipping the write if unchanged.
+
+    Returns:
+        Manifest entry with etag, size, and whether the file was rewritten
+    """
+    path = os.path.join(out_dir, rel_path)
+    etag = feed_etag(ics)
+    existing = _read_text(path)
+    unchanged = (
+        existing is not None
+        and feed_etag(existing) == etag
+        and os.path.exists(path + ".gz")
+    )
+    if unchanged:
+        return {"etag": etag, "bytes": len(existing.encode("utf-8")), "written": False}
+
+    data = ics.encode("utf-8")
+    # Sibling first, so a served .ics always has a matching (or newer) .gz
+    _atomic_write(path + ".gz", gzip.compress(data, compresslevel=9, mtime=0))
+    _atomic_write(path, data)
+    return {"etag": etag, "bytes": len(data), "written": True}
+
+
+def export_all(out_dir: str, zips: Optional[Iterable[str]] = None,
+               subs_list: Optional[Iterable[str]] = None) -> Dict[str, Dict]:
+    """
+    Render every feed for every zip/subs combination into out_dir.
+
+    Returns:
+        Manifest mapping relative path -> entry (also written to manifest.json)
+    """
+    zips = sorted(set(zips or EXPORT_ZIPS))
+    subs_options = sorted(set(subs_list or EXPORT_SUBS))
+    _validate(zips, subs_options)
+
+    manifest: Dict[str, Dict] = {}
+    manifest["ics/unc.ics"] = write_feed(out_dir, "ics/unc.ics", render_unc())
+    manifest["ics/bills/default.ics"] = write_feed(
+        out_dir, "ics/bills/default.ics", render_bills(DEFAULT_ZIP, DEFAULT_SUBS))
+    for zip_code in zips:
+        for subs in subs_options:
+            rel_path = f"ics/bills/{zip_code}/{subs}.ics"
+            manifest[rel_path] = write_feed(out_dir, rel_path, render_bills(zip_code, subs))
+
+    prune_stale(out_dir, manifest)
+    _atomic_write(
+        os.path.join(out_dir, "manifest.json"),
+        json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"),
+    )
+    return manifest
+
+
+def prune_stale(out_dir: str, manifest: Dict[str, Dict]) -> None:
+    """Remove exported feeds (and emptied directories) that aren't in manifest."""
+    ics_root = os.path.join(out_dir, "ics")
+    for dirpath, _, filenames in os.walk(ics_root, topdown=False):
+        for name in filenames:
+            if not (name.endswith(".ics") or name.endswith(".ics.gz")):
+                continue
+            path = os.path.join(dirpath, name)
+            rel_path = os.path.relpath(path, out_dir).replace(os.sep, "/")
+            if rel_path.endswith(".gz"):
+                rel_path = rel_path[:-3]
+            if rel_path not in manifest:
+                os.unlink(path)
+        if dirpath != ics_root and not os.listdir(dirpath):
+            os.rmdir(dirpath)
+
+
+def start_background_export(out_dir: str, interval: int = EXPORT_INTERVAL) -> threading.Event:
+    """
+    Re-export every `interval` seconds on a daemon thread.
+
+    Returns:
+        Event that stops the loop when set
+    """
+    stop = threading.Event()
+
+    def loop():
+        while not stop.is_set():
+            try:
+                manifest = export_all(out_dir)
+                written = sum(1 for e in manifest.values() if e["written"])
+                print(f"Exported {len(manifest)} feeds to {out_dir} ({written} changed)")
+            except Exception as e:
+                print(f"Error exporting feeds: {e}")
+            stop.wait(interval)
+
+    threading.Thread(target=loop, name="feed-export", daemon=True).start()
+    return stop
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Pre-render TeamWatcher feeds to disk.")
+    parser.add_argument("--out", default=EXPORT_DIR or "export",
+                        help="output directory (default: $TEAMWATCHER_EXPORT_DIR or ./export)")
+    parser.add_argument("--zip", action="append", dest="zips",
+                        help="ZIP code to render Bills feeds for (repeatable)")
+    parser.add_argument("--subs", action="append", dest="subs_list",
+                        help="comma-separated subscriptions, as used in subscriber URLs (repeatable)")
+    parser.add_argument("--watch", type=int, metavar="SECONDS",
+                        help="keep running and re-export on this interval")
+    args = parser.parse_args(argv)
+    try:
+        _validate(args.zips or EXPORT_ZIPS, args.subs_list or EXPORT_SUBS)
+    except ValueError as e:
+        parser.error(str(e))
+
+    while True:
+        started = time.monotonic()
+        manifest = export_all(args.out, args.zips, args.subs_list)
+        written = sum(1 for e in manifest.values() if e["written"])
+        print(f"Exported {len(manifest)} feeds to {args.out} ({written} changed) "
+              f"in {time.monotonic() - started:.1f}s")
+        if not args.watch:
+            break
+        time.sleep(args.watch)
+
+
+if __name__ == "__main__":
+    main()
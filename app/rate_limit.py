@@ -0,0 +1,240 @@
+"""
+In-process throttling for the ICS feed endpoints.
+
+Every request to a feed route in FEED_PARAMS passes three checks:
+- a per-client token bucket (requests per IP)
+- a per-feed token bucket (renders per feed; cached variants don't count)
+- a cap on distinct query-parameter combinations rendered per window
+
+Rendered feeds are cached per feed and the parameters it reads. When a
+request would need a fresh render but is over a limit, the nearest cached
+variant of the same feed (same market, for ZIP-based feeds) is served
+instead; if there is none, the client gets a 429 with Retry-After. Outcomes
+are tallied in `metrics`.
+"""
+
+import math
+import time
+from collections import Counter
+from typing import Dict, Optional, Tuple
+
+from cachetools import TTLCache
+from fastapi import Request, Response
+
+from .feeds import DEFAULT_ZIP, DEFAULT_SUBS
+from .watch_rules import get_rules
+
+# Per-client: burst of 20, then one request every 5 seconds
+IP_BUCKET_CAPACITY = 20
+IP_REFILL_PER_SEC = 0.2
+
+# Per-feed: burst of 30 renders, then one every 2 seconds
+FEED_BUCKET_CAPACITY = 30
+FEED_REFILL_PER_SEC = 0.5
+
+# Distinct parameter combinations rendered per feed per window
+VARIANT_WINDOW_SEC = 600
+MAX_VARIANTS_PER_WINDOW = 50
+
+# Rendered feed cache
+RENDER_CACHE_TTL = 300
+RENDER_CACHE_SIZE = 256
+
+# Only honor X-Forwarded-For from the local reverse proxy (Caddy)
+TRUSTED_PROXIES = {"127.0.0.1", "::1"}
+
+# Throttled feed routes -> the query parameters each one reads, with defaults.
+# Anything else (including unknown /ics/ paths) passes straight through, so
+# per-feed state stays bounded and ignored parameters can't mint new variants.
+FEED_PARAMS: Dict[str, Dict[str, str]] = {
+    "/ics/bills": {"zip": DEFAULT_ZIP, "subs": DEFAULT_SUBS},
+    "/ics/unc": {},
+}
+
+metrics: Counter = Counter()
+
+
+class TokenBucket:
+    def __init__(self, capacity: float, refill_per_sec: float):
+        self.capacity = capacity
+        self.refill_per_sec = refill_per_sec
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def take(self) -> Tuple[bool, float]:
+        """
+        Try to consume one token.
+
+        Returns:
+            (allowed, seconds until a token is available)
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_sec)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True, 0.0
+        return False, (1 - self.tokens) / self.refill_per_sec
+
+
+# Buckets are re-stored on every request (TTLCache reads don't extend the TTL),
+# so only clients idle long enough to have refilled anyway are dropped
+ip_buckets = TTLCache(maxsize=10000, ttl=IP_BUCKET_CAPACITY / IP_REFILL_PER_SEC)
+feed_buckets: Dict[str, TokenBucket] = {}
+render_cache = TTLCache(maxsize=RENDER_CACHE_SIZE, ttl=RENDER_CACHE_TTL)
+# path -> (window start, variant keys rendered in this window)
+variant_windows: Dict[str, Tuple[float, set]] = {}
+
+
+def client_ip(request: Request) -> str:
+    host = request.client.host if request.client else "unknown"
+    forwarded = request.headers.get("x-forwarded-for")
+    if forwarded and host in TRUSTED_PROXIES:
+        # The proxy appends the address it saw; anything before it is client-supplied
+        return forwarded.split(",")[-1].strip()
+    return host
+
+
+def normalize_params(request: Request, defaults: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+    """
+    The parameters an endpoint reads, with defaults filled in.
+
+    Values are kept exactly as the endpoint receives them: feeds echo zip and
+    subs back into the calendar, so folding case or order here would let one
+    request's rendering be served for another.
+    """
+    return tuple(sorted((key, request.query_params.get(key, default))
+                        for key, default in defaults.items()))
+
+
+def _variant_seen(path: str, key: Tuple) -> Tuple[bool, bool]:
+    """
+    Returns:
+        (already rendered this window, room for another new variant)
+    """
+    now = time.monotonic()
+    start, seen = variant_windows.get(path, (now, set()))
+    if now - start >= VARIANT_WINDOW_SEC:
+        start, seen = now, set()
+    variant_windows[path] = (start, seen)
+    return key in seen, len(seen) < MAX_VARIANTS_PER_WINDOW
+
+
+def _variant_retry_after(path: str) -> float:
+    start, _ = variant_windows[path]
+    return max(0.0, VARIANT_WINDOW_SEC - (time.monotonic() - start))
+
+
+def _shared_prefix(a: str, b: str) -> int:
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+def _nearest_cached(path: str, params: Tuple[Tuple[str, str], ...]) -> Optional[Tuple]:
+    """
+    Pick the cached variant of this feed closest to the requested parameters.
+
+    For feeds keyed by ZIP only variants in the same market are eligible, since
+    watch guidance differs between markets; among those, matching params win,
+    then the longest shared ZIP prefix.
+    """
+    wanted = dict(params)
+    market = None
+    if "zip" in wanted:
+        rules = get_rules()
+        market = rules.market_for_zip(wanted["zip"])
+
+    best, best_score = None, None
+    for (cached_path, cached_params), entry in list(render_cache.items()):
+        if cached_path != path:
+            continue
+        cached = dict(cached_params)
+        if market is not None and rules.market_for_zip(cached.get("zip")) != market:
+            continue
+        score = (
+            sum(1 for k, v in cached.items() if wanted.get(k) == v),
+            _shared_prefix(wanted.get("zip", ""), cached.get("zip", "")),
+        )
+        if best_score is None or score > best_score:
+            best, best_score = entry, score
+    return best
+
+
+def _cached_response(entry: Tuple, source: str) -> Response:
+    body, headers = entry
+    response = Response(content=body, headers=headers)
+    response.headers["X-Feed-Cache"] = source
+    return response
+
+
+def _too_many(retry_after: float) -> Response:
+    metrics["ratelimit.rejected_429"] += 1
+    return Response(
+        content="Too many requests",
+        status_code=429,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        media_type="text/plain",
+    )
+
+
+async def rate_limit_middleware(request: Request, call_next):
+    path = request.url.path
+    defaults = FEED_PARAMS.get(path)
+    if defaults is None:
+        return await call_next(request)
+
+    metrics["requests"] += 1
+
+    ip = client_ip(request)
+    bucket = ip_buckets.get(ip)
+    if bucket is None:
+        bucket = TokenBucket(IP_BUCKET_CAPACITY, IP_REFILL_PER_SEC)
+    allowed, retry_after = bucket.take()
+    ip_buckets[ip] = bucket
+    if not allowed:
+        metrics["ratelimit.ip_throttled"] += 1
+        return _too_many(retry_after)
+
+    params = normalize_params(request, defaults)
+    key = (path, params)
+    entry = render_cache.get(key)
+    if entry is not None:
+        metrics["feed_cache.hit"] += 1
+        return _cached_response(entry, "hit")
+
+    seen, has_room = _variant_seen(path, key)
+    over_limit = None
+    if not seen and not has_room:
+        metrics["ratelimit.variant_cap_exceeded"] += 1
+        over_limit = _variant_retry_after(path)
+    else:
+        feed_bucket = feed_buckets.get(path)
+        if feed_bucket is None:
+            feed_bucket = feed_buckets[path] = TokenBucket(FEED_BUCKET_CAPACITY, FEED_REFILL_PER_SEC)
+        allowed, retry_after = feed_bucket.take()
+        if not allowed:
+            metrics["ratelimit.feed_throttled"] += 1
+            over_limit = retry_after
+
+    if over_limit is not None:
+        nearest = _nearest_cached(path, params)
+        if nearest is not None:
+            metrics["ratelimit.fallback_served"] += 1
+            return _cached_response(nearest, "nearest")
+        return _too_many(over_limit)
+
+    metrics["feed_cache.miss"] += 1
+    response = await call_next(request)
+    if response.status_code != 200:
+        return response
+
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    headers = {k: v for k, v in response.headers.items() if k.lower() != "content-length"}
+    entry = (body, headers)
+    render_cache[key] = entry
+    variant_windows[path][1].add(key)
+    return _cached_response(entry, "miss")
@@ -1,30 +1,188 @@
-from typing import List
-
-def watch_notes_nfl(network: str, zip_code: str) -> List[str]:
-    lines = []
-    if network == "CBS":
-        lines += [
-            "NYC carriage depends on Jets/Giants conflicts; check 506 coverage map near game day.",
-            "If airing on WCBS-2 (NYC), Paramount+ will stream it; otherwise use NFL Sunday Ticket (out-of-market).",
-        ]
-    elif network == "FOX":
-        lines += [
-            "NYC carriage depends on Jets/Giants conflicts; check 506 coverage map near game day.",
-            "If airing on WNYW-5 (NYC), watch via pay-TV/vMVPD; otherwise use NFL Sunday Ticket (out-of-market).",
-        ]
-    elif network == "Prime Video":
-        lines += ["National exclusive: Watch on Prime Video."]
-    elif network in ("NBC", "ESPN/ABC", "ESPN"):
-        lines += [f"National window: {network}. Use the network app or your vMVPD."]
-    else:
-        lines += ["Time/Network TBD. Placeholder assignment; check back later."]
-    return lines
-
-def watch_notes_ncaamb(network: str) -> List[str]:
-    if not network or network == "TBD":
-        return ["Network TBD. Times and TV assignments often finalize closer to game day."]
-    if network in ("ESPN", "ESPN2", "ESPNU", "ACCN"):
-        return [f"TV: {network}. Stream via ESPN app with a participating provider."]
-    if network == "ESPN+":
-        return ["Streaming exclusive on ESPN+ (no cable login required)."]
-    return [f"TV/Stream: {network}"]
+"""
+Data-driven "how to watch" guidance.
+
+Rules live in watch_rules.json (override with TEAMWATCHER_WATCH_RULES) and are
+matched on league, network, market and subscriptions. The file is compiled
+into a lookup table on load and swapped in atomically when it changes on disk.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import List, Dict, Any, Iterable, Optional, Tuple, FrozenSet
+
+RULES_PATH = os.environ.get(
+    "TEAMWATCHER_WATCH_RULES",
+    os.path.join(os.path.dirname(__file__), "watch_rules.json"),
+)
+
+# How often (seconds) to stat the rules file for changes
+RELOAD_CHECK_INTERVAL = 5.0
+
+DEFAULT_MARKET = "default"
+ANY_NETWORK = "*"
+
+NoteKey = Tuple[str, str, str, FrozenSet[str]]
+
+
+def _check_string_list(rule: Dict[str, Any], field: str, value: Any) -> None:
+    # A bare string would otherwise be iterated one character at a time
+    if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+        hint = f" or {ANY_NETWORK!r}" if field == "network" else ""
+        raise ValueError(f"Rule {field} must be a list of strings{hint}: {value!r} in {rule!r}")
+
+
+class CompiledRules:
+    """
+    Immutable lookup table built from a rules document.
+
+    Candidate rules are pre-grouped by (league, network), so resolving notes
+    only walks the handful of rules for one network. Resolved note lists are
+    memoized per (league, network, market, subs) key.
+    """
+
+    def __init__(self, doc: Dict[str, Any]):
+        self.zip_markets: Dict[str, str] = {}
+        for market, spec in doc.get("markets", {}).items():
+            for prefix in spec.get("zip_prefixes", []):
+                self.zip_markets[prefix] = market
+
+        self.known_subs: FrozenSet[str] = frozenset()
+        self.by_network: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        wildcard: Dict[str, List[Dict[str, Any]]] = {}
+
+        for raw in doc.get("rules", []):
+            networks = raw.get("network", ANY_NETWORK)
+            if networks != ANY_NETWORK:
+                _check_string_list(raw, "network", networks)
+            _check_string_list(raw, "subs", raw.get("subs", []))
+            _check_string_list(raw, "notes", raw["notes"])
+            rule = {
+                "league": raw["league"],
+                "market": raw.get("market"),
+                "subs": frozenset(s.lower() for s in raw.get("subs", [])),
+                "notes": tuple(raw["notes"]),
+            }
+            if rule["market"] is not None and rule["market"] not in doc.get("markets", {}):
+                raise ValueError(f"Rule references undefined market: {rule['market']!r}")
+            for note in rule["notes"]:
+                # Surface bad templates now rather than as a KeyError per request
+                try:
+                    note.format(network="")
+                except (KeyError, IndexError, ValueError) as e:
+                    raise ValueError(f"Invalid note template {note!r}: {e!r}") from e
+
+            self.known_subs |= rule["subs"]
+            if networks == ANY_NETWORK:
+                # Wildcards also apply to every explicitly listed network
+                wildcard.setdefault(rule["league"], []).append(rule)
+                for (league, _), rules in self.by_network.items():
+                    if league == rule["league"]:
+                        rules.append(rule)
+                continue
+            for network in networks:
+                key = (rule["league"], network)
+                if key not in self.by_network:
+                    self.by_network[key] = list(wildcard.get(rule["league"], []))
+                self.by_network[key].append(rule)
+
+        for league, rules in wildcard.items():
+            self.by_network[(league, ANY_NETWORK)] = rules
+
+        self._memo: Dict[NoteKey, Tuple[str, ...]] = {}
+
+    def market_for_zip(self, zip_code: Optional[str]) -> str:
+        return self.zip_markets.get((zip_code or "")[:3], DEFAULT_MARKET)
+
+    def normalize_subs(self, subs: Optional[Iterable[str]]) -> FrozenSet[str]:
+        """Keep only subscriptions some rule cares about, so the memo key space stays bounded."""
+        if not subs:
+            return frozenset()
+        if isinstance(subs, str):
+            subs = subs.split(",")
+        return frozenset(s.strip().lower() for s in subs) & self.known_subs
+
+    def notes(self, league: str, network: str, market: str, subs: FrozenSet[str]) -> Tuple[str, ...]:
+        key = (league, network, market, subs)
+        cached = self._memo.get(key)
+        if cached is not None:
+            return cached
+
+        candidates = self.by_network.get((league, network))
+        if candidates is None:
+            candidates = self.by_network.get((league, ANY_NETWORK), [])
+
+        result: Tuple[str, ...] = ()
+        for rule in candidates:
+            if rule["market"] is not None and rule["market"] != market:
+                continue
+            if not rule["subs"] <= subs:
+                continue
+            result = tuple(n.format(network=network) for n in rule["notes"])
+            break
+
+        self._memo[key] = result
+        return result
+
+
+_compiled: Optional[CompiledRules] = None
+_loaded_stamp: Optional[Tuple[int, int]] = None
+_last_check = 0.0
+_reload_lock = threading.Lock()
+
+
+def _file_stamp(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def load_rules(path: str = RULES_PATH) -> CompiledRules:
+    """Parse and compile a rules file. Raises on missing or malformed input."""
+    with open(path, encoding="utf-8") as f:
+        return CompiledRules(json.load(f))
+
+
+def get_rules() -> CompiledRules:
+    """
+    Return the current compiled rules, reloading if the file has changed.
+
+    A bad edit keeps the previously loaded table in service.
+    """
+    global _compiled, _loaded_stamp, _last_check
+
+    now = time.monotonic()
+    if _compiled is not None and now - _last_check < RELOAD_CHECK_INTERVAL:
+        return _compiled
+
+    with _reload_lock:
+        if _compiled is not None and now - _last_check < RELOAD_CHECK_INTERVAL:
+            return _compiled
+        _last_check = now
+        stamp = _file_stamp(RULES_PATH)
+        if _compiled is None or (stamp is not None and stamp != _loaded_stamp):
+            try:
+                compiled = load_rules(RULES_PATH)
+            except Exception as e:
+                if _compiled is None:
+                    raise
+                print(f"Error reloading watch rules: {e}")
+            else:
+                _compiled = compiled
+            _loaded_stamp = stamp
+    return _compiled
+
+
+def watch_notes_nfl(network: str, zip_code: str, subs: Optional[Iterable[str]] = None) -> List[str]:
+    rules = get_rules()
+    return list(rules.notes("nfl", network or "", rules.market_for_zip(zip_code),
+                            rules.normalize_subs(subs)))
+
+
+def watch_notes_ncaamb(network: str, subs: Optional[Iterable[str]] = None) -> List[str]:
+    rules = get_rules()
+    return list(rules.notes("ncaamb", network or "", DEFAULT_MARKET,
+                            rules.normalize_subs(subs)))